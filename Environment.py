@@ -43,20 +43,20 @@ class Environment:
         D = Utils.make_D_matrix(A, self.num_of_remain_agents)
         L = D - A
         connected_flag, num_of_clusters = Utils.check_number_of_clusters(L, self.num_of_remain_agents)
-        return deepcopy(num_of_clusters)
+        return num_of_clusters
 
     def next_state(self, actions):
         """
-        :param actions: list
+        :param actions: (N, 3) array of unit speed vectors
         :return:
         """
-        for i in self.remain_list:
-            delta_positions = actions[i] * config_constant_speed
-            self.environment_next_positions[i] = self.environment_positions[i] + delta_positions
-        return deepcopy(self.environment_next_positions)
+        actions = np.asarray(actions)
+        remain = self.remain_list
+        self.environment_next_positions[remain] = self.environment_positions[remain] + actions[remain] * config_constant_speed
+        return self.environment_next_positions.copy()
 
     def update(self):
-        self.environment_positions = deepcopy(self.environment_next_positions)
+        self.environment_positions = self.environment_next_positions.copy()
 
     def stochastic_destroy(self, mode=1, num_of_destroyed=10, real_destroy_list=[], destroy_center=np.array([0, 0, 0]),
                            destroy_range=200):
@@ -124,7 +124,4 @@ class Environment:
             return deepcopy(destroy_num), deepcopy(destroy_list)
 
     def make_remain_positions(self):
-        self.remain_positions = []
-        for i in self.remain_list:
-            self.remain_positions.append(deepcopy(self.environment_positions[i]))
-        self.remain_positions = np.array(self.remain_positions)
+        self.remain_positions = self.environment_positions[self.remain_list]
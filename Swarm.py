@@ -58,12 +58,13 @@ class Swarm:
         self.notice_destroy = True
         for destroy_index in destroy_list:
             self.remain_list.remove(destroy_index)
-        self.true_positions = deepcopy(environment_positions)
+        # keep our own snapshot so the caller can pass its array by reference
+        self.true_positions = environment_positions.copy()
         self.remain_num = len(self.remain_list)
         # self.csds.notice_destroy(deepcopy(destroy_list))
 
     def update_true_positions(self, environment_positions):
-        self.true_positions = deepcopy(environment_positions)
+        self.true_positions = environment_positions.copy()
 
     def reset(self, change_algorithm_mode=False, algorithm_mode=0):
         self.remain_list = [i for i in range(config_num_of_agents)]
@@ -94,10 +95,10 @@ class Swarm:
         actions = np.zeros((self.num_of_agents, 3))
         max_time = 0
         self.make_remain_positions()
-        flag, num_cluster = Utils.check_if_a_connected_graph(deepcopy(self.remain_positions), len(self.remain_list))
+        flag, num_cluster = Utils.check_if_a_connected_graph(self.remain_positions, len(self.remain_list))
         if flag:
             # print("connected")
-            return deepcopy(actions), max_time
+            return actions, max_time
         else:
             if self.algorithm_mode == 0:
                 # CSDS
@@ -164,13 +165,11 @@ class Swarm:
                     self.max_time = deepcopy(max_time)
             else:
                 print("No such algorithm")
-        return deepcopy(actions), deepcopy(max_time)
+        # actions is a fresh array built in this call, no need to copy it again
+        return actions, max_time
 
     def make_remain_positions(self):
-        self.remain_positions = []
-        for i in self.remain_list:
-            self.remain_positions.append(deepcopy(self.true_positions[i]))
-        self.remain_positions = np.array(self.remain_positions)
+        self.remain_positions = self.true_positions[self.remain_list]
 
     def check_if_finish(self, cluster_index):
         flag = True
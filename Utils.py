@@ -5,24 +5,16 @@ from Configurations import *
 
 
 def make_A_matrix(positions, num_of_agents, d):
-    A = np.zeros((num_of_agents, num_of_agents))
-    for i in range(num_of_agents):
-        for j in range(i, num_of_agents):
-            if j == i:
-                A[i, j] = 0
-            else:
-                distance = np.linalg.norm(positions[i, :] - positions[j, :])
-                if distance <= d:
-                    A[i, j] = 1
-                    A[j, i] = 1
-    return deepcopy(A)
+    # pairwise distances of the (N, 3) position array in one broadcast
+    positions = positions[:num_of_agents]
+    distance = np.linalg.norm(positions[:, np.newaxis, :] - positions[np.newaxis, :, :], axis=2)
+    A = (distance <= d).astype(np.float64)
+    np.fill_diagonal(A, 0)
+    return A
 
 
 def make_D_matrix(A, num_of_agents):
-    D = np.zeros((num_of_agents, num_of_agents))
-    for i in range(num_of_agents):
-        D[i, i] = np.sum(A[i])
-    return deepcopy(D)
+    return np.diag(np.sum(A[:num_of_agents], axis=1))
 
 
 def check_number_of_clusters(L, num_of_agents):
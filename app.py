@@ -1,9 +1,14 @@
 import streamlit as st
 import matplotlib
 matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
 import time
 import sys
+import threading
+import traceback
+from collections import deque
 from copy import deepcopy
 
 from Environment import Environment
@@ -32,6 +37,29 @@ class StreamlitStdout:
         pass
 
 
+_ALGO_LABELS = {
+    0: "CSDS",
+    1: "HERO",
+    2: "Centering",
+    3: "SIDR",
+    4: "GCN 2017",
+    5: "CR-MGC (Proposed)"
+}
+
+
+# ===============================
+# Swarm 模板缓存
+# ===============================
+@st.cache_resource
+def make_swarm(algo_mode, enable_csds):
+    # 返回的实例只作模板，不可直接修改
+    return Swarm(
+        algorithm_mode=algo_mode,
+        enable_csds=enable_csds,
+        meta_param_use=True
+    )
+
+
 # ===============================
 # SimulationController
 # ===============================
@@ -46,38 +74,85 @@ class SimulationController:
         self.destroy_num = 50
         self.is_initialized = False
 
-        self.positions = []
-        self.remain_list = []
-        self.clusters = 0
-        self.connected = True
-        self.destroyed_set = set()
+        # Run All 在后台线程中推进仿真，页面只负责定时刷新
+        self.running = False
+        self.worker = None
+        self.lock = threading.Lock()
+        # 后台线程中的异常保存在这里，由页面显示
+        self.error = None
+
+        self.positions = np.empty((0, 3), dtype=np.float32)
+        self.remain_idx = np.empty(0, dtype=np.intp)
+        self.destroyed_idx = np.empty(0, dtype=np.intp)
+        self._destroyed_mask = np.zeros(config_num_of_agents, dtype=bool)
+
+        # 连通分量按状态版本缓存，Streamlit 重跑脚本时不再重复计算
+        self._state_version = 0
+        self._clusters_version = -1
+        self._clusters = 0
 
     def initialize(self):
+        self.stop()
+        self.error = None
         print("Initializing simulation...")
-        self.env = Environment()
-        self.env.reset()
-
-        enable_csds = (self.algo_mode == 0)
-        self.swarm = Swarm(
-            algorithm_mode=self.algo_mode,
-            enable_csds=enable_csds,
-            meta_param_use=True
-        )
-        self.swarm.reset(
-            change_algorithm_mode=True,
-            algorithm_mode=self.algo_mode
-        )
+        with self.lock:
+            self.env = Environment()
+            self.env.reset()
+
+            enable_csds = (self.algo_mode == 0)
+            # 模板只构建一次（HERO/CSDS 初始化开销大），每次复制一份干净的实例
+            self.swarm = deepcopy(make_swarm(self.algo_mode, enable_csds))
+            self.swarm.reset(
+                change_algorithm_mode=True,
+                algorithm_mode=self.algo_mode
+            )
 
-        self.step_count = 0
-        self.is_initialized = True
-        self.update_data()
+            self.step_count = 0
+            self._destroyed_mask = np.zeros(config_num_of_agents, dtype=bool)
+
+            # 初始破坏只在这里执行一次，step() 中不再判断首步
+            print("Executing destruction phase...")
+            self._destroy(self.destroy_num)
+            print("Destruction phase complete.")
+
+            self.is_initialized = True
+            self.update_data()
         print("Initialization complete.")
 
     def update_data(self):
-        self.positions = deepcopy(self.env.environment_positions)
-        self.remain_list = deepcopy(self.env.remain_list)
-        self.clusters = self.env.check_the_clusters()
-        self.connected = (self.clusters == 1)
+        # 仅供绘图读取，保存数组快照即可
+        self.positions = np.asarray(self.env.environment_positions, dtype=np.float32)
+        # 由掩码一次扫描得到有序下标，无需 sorted()
+        self.remain_idx = np.flatnonzero(~self._destroyed_mask)
+        self.destroyed_idx = np.flatnonzero(self._destroyed_mask)
+        self._state_version += 1
+
+    @property
+    def clusters(self):
+        if not self.is_initialized:
+            return 0
+        # 后台线程正在推进时不等待，先返回上一次的结果
+        if self._clusters_version != self._state_version and self.lock.acquire(blocking=False):
+            try:
+                self._clusters = self.env.check_the_clusters()
+                self._clusters_version = self._state_version
+            finally:
+                self.lock.release()
+        return self._clusters
+
+    @property
+    def connected(self):
+        return not self.is_initialized or self.clusters == 1
+
+    def mark_destroyed(self, destroy_list):
+        self._destroyed_mask[np.asarray(destroy_list, dtype=np.intp)] = True
+
+    def _destroy(self, n):
+        # 调用方需持有 self.lock，并在之后自行刷新绘图数据
+        _, destroy_list = self.env.stochastic_destroy(mode=2, num_of_destroyed=n)
+        self.mark_destroyed(destroy_list)
+        self.swarm.destroy_happens(tuple(destroy_list), self.env.environment_positions)
+        return destroy_list
 
     def destroy_now(self, num=None):
         if not self.is_initialized:
@@ -85,52 +160,131 @@ class SimulationController:
             return False
         n = self.destroy_num if num is None else int(num)
         print(f"Destroying {n} UAVs...")
-        _, destroy_list = self.env.stochastic_destroy(mode=2, num_of_destroyed=n)
-        self.destroyed_set.update(destroy_list)
-        self.swarm.destroy_happens(deepcopy(destroy_list), deepcopy(self.env.environment_positions))
-        self.update_data()
+        with self.lock:
+            destroy_list = self._destroy(n)
+            self.update_data()
         print(f"Destroyed indices: {destroy_list}")
         return True
 
+    def step_batch(self, n):
+        if not self.is_initialized:
+            print("Simulation not initialized")
+            return False
+
+        # 整批在锁内完成，最后只刷新一次绘图数据
+        ran = False
+        with self.lock:
+            for _ in range(n):
+                if not self._step(update=False):
+                    break
+                ran = True
+            if ran:
+                self.update_data()
+        return ran
+
     def step(self):
         if not self.is_initialized:
             print("Simulation not initialized")
             return False
 
+        with self.lock:
+            return self._step()
+
+    def _step(self, update=True):
         if self.step_count >= self.max_steps:
             print("Reached max steps")
             return False
 
         t0 = time.time()
-
-        if self.step_count == 0:
-            print("Executing destruction phase...")
-            _, destroy_list = self.env.stochastic_destroy(
-                mode=2,
-                num_of_destroyed=self.destroy_num
-            )
-            self.destroyed_set.update(destroy_list)
-            self.swarm.destroy_happens(
-                deepcopy(destroy_list),
-                deepcopy(self.env.environment_positions)
-            )
-            print("Destruction phase complete.")
+        # 热路径中先取到局部变量，减少重复的属性查找
+        env = self.env
+        swarm = self.swarm
 
         print(f"Step {self.step_count}: Taking actions...")
-        actions, _ = self.swarm.take_actions()
+        actions, _ = swarm.take_actions()
 
         print("Actions taken. Updating state...")
-        next_pos = self.env.next_state(deepcopy(actions))
-        self.swarm.update_true_positions(next_pos)
-        self.env.update()
+        next_pos = env.next_state(actions)
+        swarm.update_true_positions(next_pos)
+        env.update()
 
         self.step_count += 1
-        self.update_data()
+        # 连续多步时由调用方在最后统一刷新
+        if update:
+            self.update_data()
 
         dt = time.time() - t0
         print(f"Step {self.step_count - 1} completed in {dt:.2f}s")
         return True
 
+    def start(self):
+        if not self.is_initialized:
+            print("Simulation not initialized")
+            return
+        if self.running:
+            return
+        self.error = None
+        self.running = True
+        self.worker = threading.Thread(target=self.run_loop, daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        self.running = False
+        if self.worker is not None and self.worker is not threading.current_thread():
+            self.worker.join()
+        self.worker = None
+
+    def run_loop(self):
+        print("Run All started")
+        try:
+            while self.running and self.step():
+                time.sleep(0.05)
+            print("Run All finished")
+        except Exception as e:
+            print(f"Error in simulation thread: {e}")
+            traceback.print_exc()
+            self.error = e
+        finally:
+            self.running = False
+
+
+# ===============================
+# 绘图：每个会话只建一次 Figure，之后只更新散点坐标
+# ===============================
+_NO_POINTS = np.empty((0, 2))
+
+
+@st.cache_resource
+def initial_positions_xy():
+    return np.asarray(config_initial_swarm_positions[:, :2], dtype=np.float32)
+
+
+def make_figure():
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.set_xlim(0, 1000)
+    ax.set_ylim(0, 1000)
+    ax.set_aspect("equal")
+    active = ax.scatter([], [], c="blue", s=30)
+    destroyed = ax.scatter([], [], c="red", s=30, alpha=0.2)
+    ax.set_title("Waiting for Initialization")
+
+    # 会变化的元素设为 animated，背景（坐标轴、刻度）只绘制一次并缓存
+    for artist in (active, destroyed, ax.title):
+        artist.set_animated(True)
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    return fig, ax, active, destroyed, background
+
+
+def render_figure(fig, ax, background, artists):
+    # 恢复缓存背景后只重绘变化的元素，直接返回 RGBA 像素
+    fig.canvas.restore_region(background)
+    for artist in artists:
+        ax.draw_artist(artist)
+    return np.asarray(fig.canvas.buffer_rgba())
+
 
 # ===============================
 # Streamlit App
@@ -140,6 +294,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# 缓存调用会输出 spinner，必须放在 set_page_config 之后
+_INIT_POS = initial_positions_xy()
+
 st.title("🛩️ UAV Swarm Rescue Visualization")
 
 # -------- Session State --------
@@ -147,13 +304,21 @@ if "sim" not in st.session_state:
     st.session_state.sim = SimulationController()
 
 if "logs" not in st.session_state:
-    st.session_state.logs = []
+    # 只保留最近 500 行，与日志框显示范围一致
+    st.session_state.logs = deque(maxlen=500)
+
+if "figure" not in st.session_state:
+    st.session_state.figure = make_figure()
 
 sim = st.session_state.sim
 
-# 重定向 stdout / stderr
-sys.stdout = StreamlitStdout(st.session_state.logs)
-sys.stderr = StreamlitStdout(st.session_state.logs)
+# 重定向 stdout / stderr：每个会话只创建一次，重跑时不再重复包装
+if "stdout" not in st.session_state:
+    st.session_state.stdout = StreamlitStdout(st.session_state.logs)
+
+if sys.stdout is not st.session_state.stdout:
+    sys.stdout = st.session_state.stdout
+    sys.stderr = st.session_state.stdout
 
 # ===============================
 # Sidebar
@@ -163,16 +328,9 @@ with st.sidebar:
 
     algo_mode = st.selectbox(
         "Algorithm",
-        options=[0, 1, 2, 3, 4, 5],
+        options=list(_ALGO_LABELS),
         index=5,
-        format_func=lambda x: {
-            0: "CSDS",
-            1: "HERO",
-            2: "Centering",
-            3: "SIDR",
-            4: "GCN 2017",
-            5: "CR-MGC (Proposed)"
-        }[x]
+        format_func=_ALGO_LABELS.__getitem__
     )
 
     destroy_num = st.slider(
@@ -192,64 +350,76 @@ with st.sidebar:
         sim.destroy_now(destroy_num)
 
     if st.button("Single Step"):
-        for i in range(5):
-            sim.step()
+        sim.step_batch(5)
 
-    if st.button("Run All"):
-        if not sim.is_initialized:
-            print("Simulation not initialized")
-        else:
-            print("Run All started")
-            while sim.step():
-                time.sleep(0.05)
-            print("Run All finished")
+    if sim.running:
+        if st.button("Pause"):
+            sim.stop()
+            st.rerun()
+    elif st.button("Run All"):
+        sim.start()
+        st.rerun()
 
 
 # ===============================
 # Main Layout
 # ===============================
-col1, col2 = st.columns([3, 2])
+# 后台运行时只按 5 Hz 重跑本片段刷新画面，与仿真速度无关
+refresh_every = 0.2 if sim.running else None
 
-with col1:
-    st.subheader("Swarm Visualization")
 
-    fig, ax = plt.subplots(figsize=(8, 6))
-    ax.set_xlim(0, 1000)
-    ax.set_ylim(0, 1000)
-    ax.set_aspect("equal")
+@st.fragment(run_every=refresh_every)
+def main_layout():
+    if refresh_every and not sim.running:
+        # 后台运行已结束，整页重跑一次以停止定时刷新并恢复按钮
+        st.rerun()
 
-    if sim.is_initialized:
-        title = f"Step {sim.step_count} - "
-        title += "Connected" if sim.connected else f"{sim.clusters} Clusters"
-        ax.set_title(title, color="green" if sim.connected else "red")
-
-        xs = [sim.positions[i][0] for i in sim.remain_list]
-        ys = [sim.positions[i][1] for i in sim.remain_list]
-        ax.scatter(xs, ys, c="blue", s=30)
-        if sim.destroyed_set:
-            dxs = [config_initial_swarm_positions[i][0] for i in sorted(sim.destroyed_set)]
-            dys = [config_initial_swarm_positions[i][1] for i in sorted(sim.destroyed_set)]
-            ax.scatter(dxs, dys, c="red", s=30, alpha=0.2)
-    else:
-        ax.set_title("Waiting for Initialization")
-
-    st.pyplot(fig)
-
-with col2:
-    st.subheader("Metrics")
-    st.metric("Step", sim.step_count)
-    st.metric("Clusters", sim.clusters)
-    st.metric(
-        "Status",
-        "Connected" if sim.connected else "Disconnected"
-    )
+    if sim.error is not None:
+        st.error(f"Simulation stopped: {sim.error!r}")
 
-    st.subheader("Logs")
-    st.text_area(
-        "Simulation Log",
-        value="\n".join(st.session_state.logs[-500:]),
-        height=100   # 👈 缩短高度
-    )
+    col1, col2 = st.columns([3, 2])
 
-    if st.button("Clear Logs"):
-        st.session_state.logs.clear()
+    with col1:
+        st.subheader("Swarm Visualization")
+
+        fig, ax, active, destroyed, background = st.session_state.figure
+
+        if sim.is_initialized:
+            title = f"Step {sim.step_count} - "
+            title += "Connected" if sim.connected else f"{sim.clusters} Clusters"
+            ax.set_title(title, color="green" if sim.connected else "red")
+
+            pts = sim.positions[sim.remain_idx]
+            active.set_offsets(pts[:, :2])
+            if sim.destroyed_idx.size:
+                destroyed.set_offsets(_INIT_POS[sim.destroyed_idx])
+            else:
+                destroyed.set_offsets(_NO_POINTS)
+        else:
+            ax.set_title("Waiting for Initialization", color="black")
+            active.set_offsets(_NO_POINTS)
+            destroyed.set_offsets(_NO_POINTS)
+
+        st.image(render_figure(fig, ax, background, (active, destroyed, ax.title)))
+
+    with col2:
+        st.subheader("Metrics")
+        st.metric("Step", sim.step_count)
+        st.metric("Clusters", sim.clusters)
+        st.metric(
+            "Status",
+            "Connected" if sim.connected else "Disconnected"
+        )
+
+        st.subheader("Logs")
+        st.text_area(
+            "Simulation Log",
+            value="\n".join(st.session_state.logs),
+            height=100   # 👈 缩短高度
+        )
+
+        if st.button("Clear Logs"):
+            st.session_state.logs.clear()
+
+
+main_layout()
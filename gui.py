@@ -2,17 +2,19 @@ import flet as ft
 import matplotlib
 # Must set backend before importing pyplot
 matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import PIL.Image
 import numpy as np
 import base64
 import io
+import queue
 import threading
 import time
 import asyncio
 import traceback
 import sys
 from collections import deque
-from copy import deepcopy
 
 # Import project modules
 # Ensure these are in the python path
@@ -39,8 +41,8 @@ class SimulationController:
         self.is_initialized = False
         
         # Data for visualization
-        self.positions = []
-        self.remain_list = []
+        self.positions = np.empty((0, 3), dtype=np.float32)
+        self.remain_idx = np.empty(0, dtype=np.intp)
         self.clusters = 0
         self.connected = True
         
@@ -60,6 +62,16 @@ class SimulationController:
                 self.swarm = Swarm(algorithm_mode=self.algo_mode, enable_csds=enable_csds, meta_param_use=True)
                 self.swarm.reset(change_algorithm_mode=True, algorithm_mode=self.algo_mode)
                 
+                # Destruction phase happens once here, so step() needs no first-step branch
+                msg = "Executing destruction phase..."
+                print(msg)
+                self.log(msg)
+                _, destroy_list = self.env.stochastic_destroy(mode=2, num_of_destroyed=self.destroy_num)
+                self.swarm.destroy_happens(tuple(destroy_list), self.env.environment_positions)
+                msg = "Destruction phase complete."
+                print(msg)
+                self.log(msg)
+                
                 self.step_count = 0
                 self.running = False
                 self.is_initialized = True
@@ -71,8 +83,9 @@ class SimulationController:
             self.is_initialized = False
             
     def update_data(self):
-        self.positions = deepcopy(self.env.environment_positions)
-        self.remain_list = deepcopy(self.env.remain_list)
+        # Read-only snapshot for plotting; a float32 array copy is far cheaper than deepcopy
+        self.positions = np.asarray(self.env.environment_positions, dtype=np.float32)
+        self.remain_idx = np.asarray(self.env.remain_list, dtype=np.intp)
         self.clusters = self.env.check_the_clusters()
         self.connected = (self.clusters == 1)
         
@@ -86,35 +99,29 @@ class SimulationController:
                 return False
 
             t_start = time.time()
-            if self.step_count == 0:
-                msg = "Executing destruction phase..."
-                print(msg)
-                self.log(msg)
-                # Destruction phase
-                _, destroy_list = self.env.stochastic_destroy(mode=2, num_of_destroyed=self.destroy_num)
-                self.swarm.destroy_happens(deepcopy(destroy_list), deepcopy(self.env.environment_positions))
-                msg = "Destruction phase complete."
-                print(msg)
-                self.log(msg)
+            # Bind hot attributes to locals once per step
+            env = self.env
+            swarm = self.swarm
+            log = self.log
             
             # Action phase
             msg = f"Step {self.step_count}: Taking actions..."
             print(msg)
-            self.log(msg)
+            log(msg)
             try:
-                actions, _ = self.swarm.take_actions()
+                actions, _ = swarm.take_actions()
             except Exception as e:
                 err_msg = f"Error in take_actions: {e}"
                 print(err_msg)
-                self.log(err_msg)
+                log(err_msg)
                 traceback.print_exc()
                 return False
                 
             print(f"Step {self.step_count}: Actions taken. Updating state...")
-            self.log('Actions taken. Updating state...')
-            next_pos = self.env.next_state(deepcopy(actions))
-            self.swarm.update_true_positions(next_pos)
-            self.env.update()
+            log('Actions taken. Updating state...')
+            next_pos = env.next_state(actions)
+            swarm.update_true_positions(next_pos)
+            env.update()
             
             self.step_count += 1
             self.update_data()
@@ -122,7 +129,7 @@ class SimulationController:
             dt = time.time() - t_start
             msg = f"Step {self.step_count-1} completed in {dt:.4f}s"
             print(msg)
-            self.log(msg)
+            log(msg)
             return True
 
 async def main(page: ft.Page):
@@ -146,51 +153,76 @@ async def main(page: ft.Page):
     
     # Log view
     log_view = ft.TextField(value="", multiline=True, read_only=True, min_lines=10, expand=True)
+    # Keep only the most recent lines so the text field does not grow without bound
+    log_lines = deque(maxlen=500)
     
     # Plot Image
     plot_image = ft.Image(
-        src="",
+        src_base64="",
         width=800,
         height=600,
         fit=ft.ImageFit.CONTAIN,
         gapless_playback=True,
     )
     
+    # Build the figure once per page; each refresh only updates the artists
+    fig = Figure(figsize=(8, 6), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    
+    # Set limits based on config
+    ax.set_xlim(0, 1000)
+    ax.set_ylim(0, 1000)
+    ax.set_aspect('equal')
+    ax.set_xlabel("X Position (m)")
+    ax.set_ylabel("Y Position (m)")
+    ax.grid(True, linestyle='--', alpha=0.5)
+    
+    # Plot active agents
+    active_scatter = ax.scatter([], [], c='blue', s=30, alpha=0.7, label='Active UAV')
+    waiting_text = ax.text(500, 500, "Please Set Parameters and Initialize", ha='center', va='center', fontsize=12)
+    ax.set_title("Waiting for Initialization...")
+    fig.tight_layout()
+    
+    # Blitting: axes, ticks and grid are rendered once and cached as the background;
+    # only the animated artists are redrawn on each refresh
+    dynamic_artists = (active_scatter, waiting_text, ax.title)
+    for artist in dynamic_artists:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    
+    # The figure and its encode buffer are shared by the UI and simulation threads
+    plot_lock = threading.Lock()
+    plot_buf = io.BytesIO()
+    
     def generate_plot():
-        # Create matplotlib figure
-        fig, ax = plt.subplots(figsize=(8, 6))
-        
-        # Set limits based on config
-        ax.set_xlim(0, 1000)
-        ax.set_ylim(0, 1000)
-        ax.set_aspect('equal')
-        ax.set_xlabel("X Position (m)")
-        ax.set_ylabel("Y Position (m)")
-        
-        if sim.is_initialized:
-            title = f"Step {sim.step_count} - " + ("Connected" if sim.connected else f"Disconnected ({sim.clusters} Clusters)")
-            ax.set_title(title, color='green' if sim.connected else 'red')
-            
-            # Helper to get x, y of active agents
-            xs = [sim.positions[i][0] for i in sim.remain_list]
-            ys = [sim.positions[i][1] for i in sim.remain_list]
-            
-            # Plot active agents
-            ax.scatter(xs, ys, c='blue', s=30, alpha=0.7, label='Active UAV')
+        with plot_lock:
+            if sim.is_initialized:
+                title = f"Step {sim.step_count} - " + ("Connected" if sim.connected else f"Disconnected ({sim.clusters} Clusters)")
+                ax.set_title(title, color='green' if sim.connected else 'red')
+                
+                # Gather x, y of active agents in one indexing op
+                pts = sim.positions[sim.remain_idx]
+                active_scatter.set_offsets(pts[:, :2])
+                waiting_text.set_visible(False)
+            else:
+                ax.set_title("Waiting for Initialization...", color='black')
+                active_scatter.set_offsets(np.empty((0, 2)))
+                waiting_text.set_visible(True)
             
-        else:
-            ax.set_title("Waiting for Initialization...")
-            ax.text(500, 500, "Please Set Parameters and Initialize", ha='center', va='center', fontsize=12)
+            canvas.restore_region(background)
+            for artist in dynamic_artists:
+                ax.draw_artist(artist)
             
-        ax.grid(True, linestyle='--', alpha=0.5)
-        
-        # Save to buffer
-        buf = io.BytesIO()
-        fig.tight_layout()
-        fig.savefig(buf, format='png', dpi=100)
-        plt.close(fig)
-        buf.seek(0)
-        return base64.b64encode(buf.getvalue()).decode('utf-8')
+            # Encode the canvas pixels directly; JPEG skips PNG's zlib pass, which dominates encode time
+            plot_buf.seek(0)
+            plot_buf.truncate()
+            frame = PIL.Image.fromarray(np.asarray(canvas.buffer_rgba())).convert('RGB')
+            frame.save(plot_buf, format='JPEG', quality=80, optimize=False)
+            # Encode straight from the buffer's memory, without an intermediate bytes copy
+            with plot_buf.getbuffer() as view:
+                return base64.b64encode(view).decode('ascii')
 
     def update_ui():
         print(f"Refreshing UI: step={sim.step_count}, clusters={sim.clusters}, connected={sim.connected}")
@@ -200,7 +232,7 @@ async def main(page: ft.Page):
         status_text.color = ft.Colors.GREEN if sim.connected else ft.Colors.RED
         b64 = generate_plot()
         print(f"Generated image size: {len(b64)} bytes (base64)")
-        plot_image.src = "data:image/png;base64," + b64
+        plot_image.src_base64 = b64
         page.update()
 
     ps = page.pubsub
@@ -210,49 +242,46 @@ async def main(page: ft.Page):
         elif msg.startswith('btn:'):
             set_start_button_text(msg.split(':', 1)[1])
         elif msg.startswith('log:'):
-            log_view.value = (log_view.value + ('\n' if log_view.value else '') + msg[4:])
+            log_lines.extend(msg[4:].split('\n'))
+            log_view.value = '\n'.join(log_lines)
             log_view.update()
-        elif msg.startswith('clock:'):
-            clock_text.value = msg[6:]
-            clock_text.update()
     ps.subscribe(on_msg)
 
-    log_queue = deque(maxlen=10000)
-    msg_queue = deque(maxlen=10000)
+    # Logs, ticks and button updates share one queue; the sender blocks on it instead of polling
+    msg_queue = queue.Queue()
+    max_backlog = 10000
 
-    def run_log_dispatcher():
-        while True:
-            try:
-                if log_queue:
-                    batch = []
-                    for _ in range(min(50, len(log_queue))):
-                        batch.append(log_queue.popleft())
-                    msg_queue.append('log:' + '\n'.join(batch))
-                time.sleep(0.2)
-            except:
-                break
-    threading.Thread(target=run_log_dispatcher, daemon=True).start()
+    def post(msg):
+        # Only log lines are dropped under backlog; ticks and button updates must always arrive
+        if msg.startswith('log:') and msg_queue.qsize() >= max_backlog:
+            return
+        msg_queue.put_nowait(msg)
 
     def run_msg_sender():
         while True:
+            msg = msg_queue.get()
+            pending = None
+            if msg.startswith('log:'):
+                # Coalesce log lines that are already queued into one UI update
+                batch = [msg[4:]]
+                while len(batch) < 50:
+                    try:
+                        nxt = msg_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if not nxt.startswith('log:'):
+                        pending = nxt
+                        break
+                    batch.append(nxt[4:])
+                msg = 'log:' + '\n'.join(batch)
             try:
-                if msg_queue:
-                    ps.send_all(msg_queue.popleft())
-                time.sleep(0.05)
+                ps.send_all(msg)
+                if pending is not None:
+                    ps.send_all(pending)
             except:
                 break
     threading.Thread(target=run_msg_sender, daemon=True).start()
 
-    def run_clock():
-        while True:
-            try:
-                ts = time.strftime("%Y-%m-%d %H:%M:%S")
-                msg_queue.append('clock:' + ts)
-                time.sleep(1)
-            except:
-                break
-    threading.Thread(target=run_clock, daemon=True).start()
-
     class UiStdout:
         def __init__(self, ps, original):
             self.ps = ps
@@ -267,7 +296,7 @@ async def main(page: ft.Page):
             while '\n' in self.buffer:
                 line, self.buffer = self.buffer.split('\n', 1)
                 if line:
-                    log_queue.append(line)
+                    post('log:' + line)
         def flush(self):
             try:
                 self.original.flush()
@@ -294,9 +323,9 @@ async def main(page: ft.Page):
             return
         def run_single_step():
             ok = sim.step()
-            msg_queue.append('tick')
+            post('tick')
             if not ok:
-                msg_queue.append('btn:Start')
+                post('btn:Start')
         threading.Thread(target=run_single_step, daemon=True).start()
         
     def run_simulation():
@@ -307,15 +336,15 @@ async def main(page: ft.Page):
                 if not should_continue:
                     print("Simulation finished or stopped.")
                     sim.running = False
-                    msg_queue.append('btn:Start')
+                    post('btn:Start')
                     break
-                msg_queue.append('tick')
+                post('tick')
                 time.sleep(0.05)
         except Exception as e:
             print(f"Error in simulation thread: {e}")
             traceback.print_exc()
             sim.running = False
-            msg_queue.append('btn:Start')
+            post('btn:Start')
             
     def on_start_click(e):
         if not sim.is_initialized:
@@ -401,8 +430,16 @@ async def main(page: ft.Page):
     )
 
     # Initial render
-    plot_image.src = "data:image/png;base64," + generate_plot()
+    plot_image.src_base64 = generate_plot()
     page.update()
 
+    # Clock runs on the page's event loop rather than a dedicated sleeping thread
+    async def run_clock():
+        while True:
+            clock_text.value = time.strftime("%Y-%m-%d %H:%M:%S")
+            clock_text.update()
+            await asyncio.sleep(1)
+    page.run_task(run_clock)
+
 if __name__ == "__main__":
     ft.app(target=main, view=ft.AppView.WEB_BROWSER)